@@ -3,22 +3,43 @@
 Server för 10.0.0.38 - SSH och webbtjänst
 """
 
+import argparse
+import asyncio
+import collections
+import email.utils
+import gzip
+import hashlib
+import http
 import http.server
-import socketserver
-import sys
+import io
 import os
-import subprocess
+import queue
+import re
+import selectors
+import socket
+import threading
+import time
+from typing import NamedTuple
 
 IP = "10.0.0.38"
-PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
-
-class ServerHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        
-        html_content = f'''
+# Standardport, t.ex. under uvicorn där ingen port finns i argv. En port på
+# kommandoraden sätts av main() via use_port()
+PORT = int(os.environ.get('PORT', 8080))
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STARTED = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+
+# HTML-sidan är statisk och byggs därför en gång vid uppstart
+HTML_TEMPLATE = '''
         <!DOCTYPE html>
         <html>
         <head>
@@ -48,19 +69,571 @@ class ServerHandler(http.server.SimpleHTTPRequestHandler):
                     <p><strong>Status:</strong> Kontrollera SSH-tjänst på servern</p>
                 </div>
                 <p>Denna server körs via Server Manager och är tillgänglig från nätverket!</p>
-                <p><em>Startad: {os.popen('date').read().strip()}</em></p>
+                <p><em>Startad: {STARTED}</em></p>
             </div>
         </body>
         </html>
         '''
-        self.wfile.write(html_content.encode('utf-8'))
 
-if __name__ == "__main__":
-    with socketserver.TCPServer((IP, PORT), ServerHandler) as httpd:
+def minify(html: bytes) -> bytes:
+    """Tar bort indentering och radbrytningar mellan taggar och CSS-regler"""
+    return re.sub(rb'\s*\n\s*', b'', html).strip()
+
+def build_page(port: int, started: str = STARTED) -> bytes:
+    return minify(HTML_TEMPLATE.format(IP=IP, PORT=port, STARTED=started).encode('utf-8'))
+
+RESPONSE_BODY: bytes = build_page(PORT)
+# Varje uvicorn-worker importerar modulen själv och får en egen starttid. Last-Modified
+# tas därför från modulfilen och ETag beräknas på sidan utan starttid, så att alla
+# processer svarar med samma värden och 304-valideringen fungerar oavsett process
+LAST_MODIFIED = email.utils.formatdate(os.stat(__file__).st_mtime, usegmt=True)
+CACHE_CONTROL = 'public, max-age=60'
+SEND_BUFFER_SIZE = 256 * 1024
+
+def build_response(status: http.HTTPStatus, headers, body: bytes = b'') -> bytes:
+    """Bygger ett komplett HTTP/1.1-svar (statusrad, headers och body)"""
+    lines = [f'HTTP/1.1 {status.value} {status.phrase}']
+    lines += [f'{key}: {value}' for key, value in headers]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+class CachedResponse(NamedTuple):
+    """Förberäknade svar för en innehållskodning av sidan"""
+    encoding: str
+    etag: str
+    body: bytes
+    headers: list
+    head: bytes
+    full: bytes
+    not_modified: bytes
+
+def build_cached_response(body: bytes, etag: str, encoding: str = 'identity',
+                          keep_alive: bool = True) -> CachedResponse:
+    """Bygger alla svar för en kodning en gång, så att inget formateras per request.
+    headers innehåller inte Connection; den läggs bara i de färdiga svaren."""
+    headers = [
+        ('Content-Type', 'text/html; charset=utf-8'),
+        ('Content-Length', str(len(body))),
+    ]
+    if encoding != 'identity':
+        headers.append(('Content-Encoding', encoding))
+    headers += [
+        ('Vary', 'Accept-Encoding'),
+        ('ETag', etag),
+        ('Last-Modified', LAST_MODIFIED),
+        ('Cache-Control', CACHE_CONTROL),
+    ]
+    connection = ('Connection', 'keep-alive' if keep_alive else 'close')
+    head = build_response(http.HTTPStatus.OK, headers + [connection])
+    not_modified = build_response(http.HTTPStatus.NOT_MODIFIED, [
+        ('Vary', 'Accept-Encoding'), ('ETag', etag), ('Cache-Control', CACHE_CONTROL), connection])
+    return CachedResponse(encoding, etag, body, headers, head, head + body, not_modified)
+
+def build_responses(body: bytes, fingerprint: bytes) -> dict:
+    """Komprimerar sidan en gång vid uppstart, aldrig per request. Nycklarna är
+    (kodning, keep_alive) så att Connection-headern stämmer med vad servern gör.
+    ETag beräknas på fingerprint (sidan utan starttid) och är svag, eftersom
+    processer som startat olika sekunder skiljer sig i just starttiden."""
+    bodies = {
+        'identity': body,
+        'gzip': gzip.compress(body, 9, mtime=0),
+    }
+    if brotli is not None:
+        bodies['br'] = brotli.compress(body, quality=11)
+    etags = {
+        encoding: 'W/"' + hashlib.sha256(encoding.encode('ascii') + b'\0' + fingerprint).hexdigest()[:16] + '"'
+        for encoding in bodies
+    }
+    return {
+        (encoding, keep_alive): build_cached_response(data, etags[encoding], encoding, keep_alive)
+        for encoding, data in bodies.items()
+        for keep_alive in (True, False)
+    }
+
+RESPONSES = build_responses(RESPONSE_BODY, build_page(PORT, started=''))
+
+NOT_IMPLEMENTED_RESPONSE = build_response(
+    http.HTTPStatus.NOT_IMPLEMENTED, [('Content-Length', '0'), ('Connection', 'close')])
+URI_TOO_LONG_RESPONSE = build_response(
+    http.HTTPStatus.REQUEST_URI_TOO_LONG, [('Content-Length', '0'), ('Connection', 'close')])
+HEADERS_TOO_LARGE_RESPONSE = build_response(
+    http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, [('Content-Length', '0'), ('Connection', 'close')])
+
+SERVER_VERSION = (f'{http.server.BaseHTTPRequestHandler.server_version} '
+                  f'{http.server.BaseHTTPRequestHandler.sys_version}')
+
+# Svaren med Server- och Date-header, byggs om högst en gång per sekund
+_dated_responses = (None, RESPONSES)
+
+def current_responses() -> dict:
+    """Returnerar alla svar med aktuell Date-header utan att formatera datum per request"""
+    global _dated_responses
+    now = int(time.time())
+    second, responses = _dated_responses
+    if second != now:
+        prefix = (f'Server: {SERVER_VERSION}\r\n'
+                  f'Date: {email.utils.formatdate(now, usegmt=True)}\r\n').encode('latin-1')
+
+        def with_prefix(response: bytes) -> bytes:
+            end = response.index(b'\r\n') + 2
+            return response[:end] + prefix + response[end:]
+
+        responses = {
+            key: response._replace(head=with_prefix(response.head),
+                                   full=with_prefix(response.full),
+                                   not_modified=with_prefix(response.not_modified))
+            for key, response in RESPONSES.items()
+        }
+        _dated_responses = (now, responses)
+    return responses
+
+def select_response(accept_encoding: str, keep_alive: bool = True) -> CachedResponse:
+    """Väljer den bästa förkomprimerade varianten utifrån Accept-Encoding"""
+    responses = current_responses()
+    if 'br' in accept_encoding and ('br', keep_alive) in responses:
+        return responses['br', keep_alive]
+    if 'gzip' in accept_encoding:
+        return responses['gzip', keep_alive]
+    return responses['identity', keep_alive]
+
+# Accessloggen samlas i en ringbuffert och skrivs till stderr i batchar av en
+# bakgrundstråd, så att request-trådarna aldrig formaterar eller skriver loggrader
+ACCESS_LOG = collections.deque(maxlen=10000)
+
+def flush_access_log():
+    """Formaterar och skriver alla buffrade loggrader med ett enda write"""
+    lines = []
+    while ACCESS_LOG:
+        client, when, format, args = ACCESS_LOG.popleft()
+        year, month, day, hh, mm, ss, _, _, _ = time.localtime(when)
+        lines.append("%s - - [%02d/%3s/%04d %02d:%02d:%02d] %s\n" % (
+            client, day, http.server.BaseHTTPRequestHandler.monthname[month], year, hh, mm, ss,
+            format % args))
+    if lines:
+        os.write(2, ''.join(lines).encode('utf-8', 'backslashreplace'))
+
+def access_log_writer(interval: float = 1.0):
+    while True:
+        time.sleep(interval)
+        flush_access_log()
+
+# Requestraden för de enda anrop sidan behöver hantera
+REQUEST_LINE = re.compile(rb'(GET|HEAD) (\S+) HTTP/1\.([01])\r?\n\Z')
+MAX_HEADERS = 100
+
+class ServerHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 ger keep-alive: klienten återanvänder samma TCP-anslutning
+    protocol_version = 'HTTP/1.1'
+    # Stäng av Nagle så att små svar skickas direkt
+    disable_nagle_algorithm = True
+    # Gäller bara medan en påbörjad request läses; inaktiva keep-alive-anslutningar
+    # väntar hos servern utan arbetstråd (se Server.idle_loop)
+    timeout = 5
+    # Sant när anslutningen lämnats till servern i väntan på nästa request
+    parked = False
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE)
+
+    def handle(self):
+        self.close_connection = False
+        self.handle_pending()
+
+    def handle_pending(self):
+        """Hanterar requests så länge data redan finns och parkerar sedan anslutningen,
+        så att en klient som håller keep-alive öppen inte låser en arbetstråd"""
+        while not self.close_connection:
+            if not self.request_pending():
+                self.parked = True
+                return
+            self.handle_one_request()
+
+    def resume(self):
+        """Fortsätter en parkerad anslutning när klienten har skickat data"""
+        self.parked = False
+        try:
+            self.handle_one_request()
+            self.handle_pending()
+        finally:
+            if not self.parked:
+                self.finish()
+
+    def finish(self):
+        if not self.parked:
+            super().finish()
+
+    def request_pending(self) -> bool:
+        """Sant om nästa request redan finns i läsbufferten eller socketen, utan att vänta"""
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except (BlockingIOError, InterruptedError):
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def log_message(self, format, *args):
+        ACCESS_LOG.append((self.client_address[0], time.time(), format, args))
+
+    def send_error(self, code, message=None, explain=None):
+        """Som send_error i http.server, men headers och body skickas med ett enda sendall"""
+        wfile = self.wfile
+        self.wfile = io.BytesIO()
+        try:
+            super().send_error(code, message, explain)
+            wfile.write(self.wfile.getvalue())
+        finally:
+            self.wfile = wfile
+
+    def read_headers(self, match):
+        """Snabb parser för GET/HEAD: läser bara de headers sidan behöver och hoppar
+        över http.server:s fullständiga header-parsning. Returnerar
+        (Accept-Encoding, If-None-Match) eller None om ett felsvar redan skickats."""
+        self.command = match.group(1).decode('ascii')
+        self.path = match.group(2).decode('latin-1')
+        self.request_version = 'HTTP/1.' + match.group(3).decode('ascii')
+        self.requestline = self.raw_requestline.rstrip(b'\r\n').decode('latin-1')
+        keep_alive = self.request_version == 'HTTP/1.1'
+        accept_encoding = if_none_match = ''
+
+        for _ in range(MAX_HEADERS + 1):
+            line = self.rfile.readline(65537)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(line) > 65536:
+                self.send_error(http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Line too long")
+                return None
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'accept-encoding':
+                accept_encoding = value.strip().decode('latin-1')
+            elif name == b'if-none-match':
+                if_none_match = value.strip().decode('latin-1')
+            elif name == b'connection':
+                connection = value.strip().lower()
+                if connection == b'close':
+                    keep_alive = False
+                elif connection == b'keep-alive':
+                    keep_alive = True
+        else:
+            self.send_error(http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+            return None
+
+        self.close_connection = not keep_alive
+        return accept_encoding, if_none_match
+
+    def handle_one_request(self):
+        """Läser en request och skickar ett förberäknat svar utan send_header-maskineriet"""
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+            if len(self.raw_requestline) > 65536:
+                self.requestline = ''
+                self.request_version = ''
+                self.command = ''
+                self.send_error(http.HTTPStatus.REQUEST_URI_TOO_LONG)
+                return
+            if not self.raw_requestline:
+                self.close_connection = True
+                return
+
+            match = REQUEST_LINE.match(self.raw_requestline)
+            if match:
+                headers = self.read_headers(match)
+                if headers is None:
+                    return
+                accept_encoding, if_none_match = headers
+            else:
+                # Allt som inte är en enkel GET/HEAD går via http.server:s vanliga parser
+                if not self.parse_request():
+                    return
+                if self.command not in ('GET', 'HEAD'):
+                    self.send_error(http.HTTPStatus.NOT_IMPLEMENTED, f"Unsupported method ({self.command!r})")
+                    return
+                accept_encoding = self.headers.get('Accept-Encoding', '')
+                if_none_match = self.headers.get('If-None-Match')
+
+            response = select_response(accept_encoding, not self.close_connection)
+
+            # Klienten har redan sidan - svara utan body
+            if if_none_match == response.etag:
+                self.wfile.write(response.not_modified)
+                self.log_request(http.HTTPStatus.NOT_MODIFIED)
+                return
+
+            self.wfile.write(response.full if self.command == 'GET' else response.head)
+            self.log_request(http.HTTPStatus.OK)
+        except TimeoutError as e:
+            self.log_error("Request timed out: %r", e)
+            self.close_connection = True
+
+class Server(http.server.HTTPServer):
+    # En fast pool av arbetstrådar hanterar requests, så att ingen tråd behöver
+    # startas per anslutning. Mellan requests väntar anslutningarna i idle_loop,
+    # så poolen behöver bara räcka till de requests som pågår samtidigt
+    allow_reuse_address = True
+    request_queue_size = 4096
+    max_workers = min(64, (os.cpu_count() or 1) * 8)
+    # Sekunder en keep-alive-anslutning får vara inaktiv innan den stängs
+    idle_timeout = 15
+    # Bara med --workers: annars skulle en andra kopia på samma port binda utan
+    # fel och kärnan dela anslutningarna med den
+    reuse_port = False
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().server_bind()
+
+    def server_activate(self):
+        super().server_activate()
+        self.connections = queue.SimpleQueue()
+        self.idle_queue = queue.SimpleQueue()
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        self.wakeup_r.setblocking(False)
+        self.wakeup_w.setblocking(False)
+        # Daemon-trådar så att Ctrl-C inte väntar på öppna keep-alive-anslutningar
+        threading.Thread(target=self.idle_loop, daemon=True).start()
+        for _ in range(self.max_workers):
+            threading.Thread(target=self.worker, daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self.connections.put((request, client_address))
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def worker(self):
+        while True:
+            item = self.connections.get()
+            if isinstance(item, tuple):
+                request, client_address = item
+                handler = None
+            else:
+                handler = item
+                request, client_address = handler.request, handler.client_address
+            try:
+                if handler is None:
+                    handler = self.finish_request(request, client_address)
+                else:
+                    handler.resume()
+            except Exception:
+                handler = None
+                self.handle_error(request, client_address)
+            if handler is not None and handler.parked:
+                self.park(handler)
+            else:
+                self.shutdown_request(request)
+
+    def park(self, handler):
+        """Lämnar en inaktiv anslutning till idle_loop"""
+        self.idle_queue.put(handler)
+        try:
+            self.wakeup_w.send(b'\0')
+        except BlockingIOError:
+            # idle_loop har redan väckningar att läsa
+            pass
+
+    def close_idle(self, handler):
+        handler.parked = False
+        handler.finish()
+        self.shutdown_request(handler.request)
+
+    def idle_loop(self):
+        """Väntar med en selector på parkerade anslutningar och köar dem till
+        arbetstrådarna först när klienten har skickat något. Anslutningar som varit
+        inaktiva längre än idle_timeout stängs."""
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.wakeup_r, selectors.EVENT_READ)
+            next_sweep = time.monotonic() + 1
+            while True:
+                for key, _ in sel.select(1.0):
+                    if key.data is None:
+                        try:
+                            while self.wakeup_r.recv(4096):
+                                pass
+                        except BlockingIOError:
+                            pass
+                        continue
+                    sel.unregister(key.fileobj)
+                    self.connections.put(key.data)
+
+                now = time.monotonic()
+                while True:
+                    try:
+                        handler = self.idle_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    handler.idle_since = now
+                    sel.register(handler.connection, selectors.EVENT_READ, handler)
+
+                if now >= next_sweep:
+                    next_sweep = now + 1
+                    for key in list(sel.get_map().values()):
+                        if key.data is not None and now - key.data.idle_since > self.idle_timeout:
+                            sel.unregister(key.fileobj)
+                            self.close_idle(key.data)
+
+def asgi_headers(headers) -> list:
+    return [(key.lower().encode('latin-1'), value.encode('latin-1')) for key, value in headers]
+
+def build_asgi_headers(responses: dict):
+    # Under uvicorn sköter servern själv Connection-headern
+    headers = {encoding: asgi_headers(response.headers)
+               for (encoding, keep_alive), response in responses.items() if keep_alive}
+    not_modified_headers = {
+        encoding: asgi_headers([('Vary', 'Accept-Encoding'), ('ETag', response.etag), ('Cache-Control', CACHE_CONTROL)])
+        for (encoding, keep_alive), response in responses.items() if keep_alive
+    }
+    return headers, not_modified_headers
+
+ASGI_HEADERS, ASGI_NOT_MODIFIED_HEADERS = build_asgi_headers(RESPONSES)
+
+def use_port(port: int):
+    """Bygger om sidan och alla förberäknade svar för en annan port än standardporten"""
+    global PORT, RESPONSE_BODY, RESPONSES, _dated_responses, ASGI_HEADERS, ASGI_NOT_MODIFIED_HEADERS
+    PORT = port
+    RESPONSE_BODY = build_page(port)
+    RESPONSES = build_responses(RESPONSE_BODY, build_page(port, started=''))
+    _dated_responses = (None, RESPONSES)
+    ASGI_HEADERS, ASGI_NOT_MODIFIED_HEADERS = build_asgi_headers(RESPONSES)
+
+async def app(scope, receive, send):
+    """ASGI-app för uvicorn/httptools (se README)"""
+    if scope['type'] != 'http':
+        return
+    headers = dict(scope['headers'])
+    response = select_response(headers.get(b'accept-encoding', b'').decode('latin-1'))
+    if headers.get(b'if-none-match', b'').decode('latin-1') == response.etag:
+        await send({'type': 'http.response.start', 'status': 304, 'headers': ASGI_NOT_MODIFIED_HEADERS[response.encoding]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    await send({'type': 'http.response.start', 'status': 200, 'headers': ASGI_HEADERS[response.encoding]})
+    await send({'type': 'http.response.body', 'body': response.body if scope['method'] != 'HEAD' else b''})
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Hanterar en anslutning i asyncio-läget, med keep-alive"""
+    try:
+        while True:
+            # readline ger ValueError för rader längre än StreamReader:s gräns (64 KiB)
+            try:
+                request_line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                writer.write(URI_TOO_LONG_RESPONSE)
+                break
+            if not request_line:
+                break
+
+            headers = {}
+            try:
+                for _ in range(MAX_HEADERS + 1):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.partition(b':')
+                    headers[name.strip().lower()] = value.strip()
+                else:
+                    writer.write(HEADERS_TOO_LARGE_RESPONSE)
+                    break
+            except (ValueError, asyncio.LimitOverrunError):
+                writer.write(HEADERS_TOO_LARGE_RESPONSE)
+                break
+
+            parts = request_line.split()
+            method = parts[0] if parts else b''
+            version = parts[2] if len(parts) > 2 else b'HTTP/1.0'
+
+            if method not in (b'GET', b'HEAD'):
+                writer.write(NOT_IMPLEMENTED_RESPONSE)
+                break
+
+            connection = headers.get(b'connection', b'').lower()
+            keep_alive = connection != b'close' and (version != b'HTTP/1.0' or connection == b'keep-alive')
+
+            response = select_response(headers.get(b'accept-encoding', b'').decode('latin-1'), keep_alive)
+            if headers.get(b'if-none-match', b'').decode('latin-1') == response.etag:
+                writer.write(response.not_modified)
+            elif method == b'HEAD':
+                writer.write(response.head)
+            else:
+                writer.write(response.full)
+            await writer.drain()
+
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve_asyncio(reuse_port: bool = False):
+    """Kör servern på asyncio-loopen (uvloop om den finns installerad)"""
+    server = await asyncio.start_server(handle, IP, PORT, backlog=4096, reuse_port=reuse_port)
+    async with server:
+        await server.serve_forever()
+
+def write_static(path: str):
+    """Skriver den förberäknade sidan till disk så att Nginx kan servera den direkt"""
+    if os.path.isdir(path):
+        path = os.path.join(path, 'index.html')
+    with open(path, 'wb') as f:
+        f.write(RESPONSE_BODY)
+    print(f"✅ Statisk sida skriven till {path}")
+
+def spawn_workers(count: int) -> bool:
+    """Forkar count-1 arbetsprocesser. Varje process binder sedan en egen socket
+    mot samma port med SO_REUSEPORT och kärnan fördelar anslutningarna mellan dem.
+    Returnerar True i huvudprocessen."""
+    for _ in range(count - 1):
+        if os.fork() == 0:
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Server för 10.0.0.38")
+    parser.add_argument('port', nargs='?', type=int, default=PORT,
+                        help="Port att lyssna på (standard: miljövariabeln PORT eller 8080)")
+    parser.add_argument('--asyncio', action='store_true',
+                        help="Använd asyncio-servern (uvloop om installerad)")
+    parser.add_argument('--write-static', metavar='PATH',
+                        help="Skriv HTML-sidan till PATH (fil eller katalog) för Nginx och avsluta")
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="Antal processer som delar porten via SO_REUSEPORT, t.ex. $(nproc)")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers måste vara minst 1")
+    if args.workers > 1 and not (hasattr(socket, 'SO_REUSEPORT') and hasattr(os, 'fork')):
+        parser.error("--workers kräver SO_REUSEPORT och fork (Linux/BSD)")
+
+    if args.port != PORT:
+        use_port(args.port)
+
+    if args.write_static:
+        write_static(args.write_static)
+        return
+
+    # Forka innan några trådar eller event-loopar startas
+    is_main_process = spawn_workers(args.workers)
+    if is_main_process:
         print(f"🌐 Server 10.0.0.38 startad på {IP}:{PORT}")
         print(f"   Tillgänglig via: http://{IP}:{PORT}")
         print(f"   SSH: ssh root@{IP}")
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
+        if args.workers > 1:
+            print(f"   Processer: {args.workers} (SO_REUSEPORT)")
+    try:
+        if args.asyncio:
+            if uvloop is not None:
+                uvloop.install()
+            asyncio.run(serve_asyncio(reuse_port=args.workers > 1))
+        else:
+            threading.Thread(target=access_log_writer, daemon=True).start()
+            Server.reuse_port = args.workers > 1
+            with Server((IP, PORT), ServerHandler) as httpd:
+                httpd.serve_forever()
+    except KeyboardInterrupt:
+        flush_access_log()
+        if is_main_process:
             print(f"\n🛑 Server 10.0.0.38 stoppad på {IP}:{PORT}")
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,51 @@ Server Manager - En terminalapplikation för att hantera servrar
 Med SSH-funktionalitet för fjärråtkomst
 """
 
+import errno
 import json
 import os
+import selectors
+import shlex
+import shutil
+import socket
 import subprocess
 import sys
+import tempfile
+import threading
 import time
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
+from functools import lru_cache
 
-@dataclass
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps(data) -> bytes:
+    """Serialiserar konfigurationen till UTF-8 JSON (orjson om installerat)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+def _loads(raw: bytes):
+    """Tolkar konfigurationen från UTF-8 JSON (orjson om installerat)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+STATUS_EMOJI = {"running": "🟢", "stopped": "🔴"}
+
+# Radmallar för serverlistan
+HEADER_ROW = f"{'Namn':<20} {'Port':<8} {'Status':<12} {'Beskrivning':<30}"
+ROW_FMT = "{name:<20} {port:<8} {emoji} {status:<10} {desc:<30}".format
+
+# Hur länge start_server väntar på att en nystartad server ska avslutas innan den
+# räknas som startad. Testservern behöver omkring 100 ms för att nå bind() och dö
+STARTUP_TIMEOUT = 0.25
+
+@dataclass(slots=True)
 class Server:
     name: str
     command: str
@@ -22,67 +58,272 @@ class Server:
     auto_start: bool = False
     pid: Optional[int] = None
     status: str = "stopped"
+    # Förtolkat kommando, sparas inte i konfigurationsfilen
+    argv: Optional[List[str]] = field(default=None, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if self.argv is None:
+            self.argv = split_command(self.command)
+
+def split_command(command: str) -> List[str]:
+    """Delar upp ett kommando som ett skal gör, så att citerade argument med mellanslag bevaras"""
+    try:
+        return shlex.split(command, posix=os.name != 'nt')
+    except ValueError:
+        # T.ex. ett oavslutat citattecken - gör som tidigare
+        return command.split()
+
+def _read_proc(pid: int):
+    """Läser (ppid, kommandorad) direkt från /proc utan att starta ps"""
+    with open(f'/proc/{pid}/stat', 'rb') as f:
+        stat = f.read()
+    # Fältet comm står inom parentes och kan innehålla mellanslag
+    ppid = int(stat[stat.rindex(b')') + 2:].split()[1])
+    with open(f'/proc/{pid}/cmdline', 'rb') as f:
+        cmd = f.read().rstrip(b'\x00').replace(b'\x00', b' ').decode(errors='replace')
+    if not cmd:
+        cmd = '[' + stat[stat.index(b'(') + 1:stat.rindex(b')')].decode(errors='replace') + ']'
+    return ppid, cmd
+
+def _list_proc():
+    """Listar (pid, ppid, kommandorad) för alla processer i /proc"""
+    processes = []
+    for entry in os.scandir('/proc'):
+        if entry.name.isdigit():
+            try:
+                processes.append((int(entry.name),) + _read_proc(int(entry.name)))
+            except (OSError, ValueError):
+                # Processen hann avslutas medan vi läste
+                continue
+    return processes
+
+# Senaste processlistan och när den lästes, delas mellan ssh_status och manage_processes
+_PS_CACHE = {'t': 0.0, 'data': []}
+
+def _scan_processes(ttl: float = 2.0):
+    """Som _list_proc, men återanvänder en lista som är yngre än ttl sekunder"""
+    now = time.monotonic()
+    if not _PS_CACHE['data'] or now - _PS_CACHE['t'] >= ttl:
+        _PS_CACHE['data'] = sorted(_list_proc())
+        _PS_CACHE['t'] = now
+    return _PS_CACHE['data']
+
+def _listening_on_port(port: int) -> List[str]:
+    """Listar adresser som lyssnar på en TCP-port genom att läsa /proc/net/tcp och tcp6"""
+    listening = []
+    suffix = f':{port:04X}'
+    for path, family in (('/proc/net/tcp', socket.AF_INET), ('/proc/net/tcp6', socket.AF_INET6)):
+        try:
+            with open(path) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    local, state = fields[1], fields[3]
+                    # 0A = TCP_LISTEN
+                    if state != '0A' or not local.endswith(suffix):
+                        continue
+                    # Adressen är hex i värdens byteordning (little-endian per 32-bitarsord)
+                    raw = bytes.fromhex(local[:-5])
+                    raw = b''.join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+                    address = socket.inet_ntop(family, raw)
+                    listening.append(f"{address}:{port}" if family == socket.AF_INET else f"[{address}]:{port}")
+        except FileNotFoundError:
+            # tcp6 saknas om IPv6 är avstängt
+            if family == socket.AF_INET:
+                raise
+    return listening
+
+@lru_cache(maxsize=1)
+def _ssh_dir() -> str:
+    return os.path.expanduser("~/.ssh")
+
+@lru_cache(maxsize=8)
+def _ssh_listdir(path: str, mtime_ns: int) -> tuple:
+    """Innehållet i en katalog; mtime ingår i nyckeln så att ändringar läses om"""
+    return tuple(sorted(os.listdir(path)))
 
 class ServerManager:
     def __init__(self, config_file: str = "servers.json"):
         self.config_file = config_file
         self.servers: Dict[str, Server] = {}
+        self._dirty = False
+        # (st_mtime_ns, st_size) och tolkad JSON från senaste läsning/skrivning
+        self._load_cache = None
+        # pidfd per körande server (sparas inte), för händelsestyrd väntan på processer
+        self._pidfds: Dict[str, int] = {}
+        # Namn på servrar som körs, så att de kan listas utan att gå igenom alla servrar
+        self._running: Set[str] = set()
+        # Öppna loggfiler per server, återanvänds mellan omstarter
+        self._logfds: Dict[str, object] = {}
+        # En gemensam selector för portkontroller och pidfd-väntan
+        self._sel = selectors.DefaultSelector()
+        # Skyddar servers, _running, _pidfds och skrivning av konfigurationen när
+        # servrar startas parallellt
+        self._lock = threading.RLock()
         self.load_servers()
     
     def load_servers(self):
         """Laddar servrar från konfigurationsfil"""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for name, server_data in data.items():
-                        self.servers[name] = Server(**server_data)
+                # Hoppa över läsning och JSON-tolkning om filen inte har ändrats
+                st = os.stat(self.config_file)
+                key = (st.st_mtime_ns, st.st_size)
+                if self._load_cache is not None and self._load_cache[0] == key:
+                    data = self._load_cache[1]
+                else:
+                    with open(self.config_file, 'rb') as f:
+                        data = _loads(f.read())
+                    self._load_cache = (key, data)
+                for name, server_data in data.items():
+                    server = Server(**server_data)
+                    self.servers[name] = server
+                    self._reconcile(name, server)
             except Exception as e:
                 print(f"Fel vid laddning av servrar: {e}")
     
-    def save_servers(self):
-        """Sparar servrar till konfigurationsfil"""
+    def _reconcile(self, name: str, server: Server):
+        """Återställer status för servrar vars process inte längre finns"""
+        self._untrack(name)
+        self._running.discard(name)
+        if server.status != "running":
+            return
+        
+        # os.kill(pid, 0) skulle avsluta processen på Windows
+        if server.pid and os.name != 'nt':
+            try:
+                alive = self._track(name, server.pid)
+                if not alive:
+                    os.kill(server.pid, 0)
+            except ProcessLookupError:
+                server.pid = None
+                server.status = "stopped"
+                self.save_servers(flush=False)
+                return
+            except PermissionError:
+                # Processen finns men tillhör en annan användare
+                pass
+        self._running.add(name)
+    
+    def _track(self, name: str, pid: int) -> bool:
+        """Öppnar och sparar en pidfd för serverns process.
+        Returnerar False om pidfd inte stöds; ProcessLookupError om processen inte finns."""
+        self._untrack(name)
+        if not hasattr(os, 'pidfd_open'):
+            return False
         try:
-            data = {name: asdict(server) for name, server in self.servers.items()}
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Fel vid sparande av servrar: {e}")
+            self._pidfds[name] = os.pidfd_open(pid)
+        except ProcessLookupError:
+            raise
+        except OSError:
+            return False
+        return True
+    
+    def log_path(self, name: str) -> str:
+        """Sökväg till serverns loggfil, bredvid konfigurationsfilen"""
+        return os.path.join(os.path.dirname(self.config_file), f"{name}.log")
+    
+    def _log_file(self, name: str):
+        logfile = self._logfds.get(name)
+        if logfile is None or logfile.closed:
+            logfile = open(self.log_path(name), 'ab')
+            self._logfds[name] = logfile
+        return logfile
+    
+    def _untrack(self, name: str):
+        pidfd = self._pidfds.pop(name, None)
+        if pidfd is not None:
+            os.close(pidfd)
+    
+    @property
+    def running_servers(self) -> Set[str]:
+        """Namn på de servrar som körs"""
+        return self._running
+    
+    def save_servers(self, flush: bool = True):
+        """Sparar servrar till konfigurationsfil.
+        Med flush=False markeras konfigurationen bara som ändrad och skrivs vid
+        nästa flush_servers(), så att massoperationer skriver filen en gång."""
+        with self._lock:
+            self._dirty = True
+            if flush:
+                self.flush_servers()
+    
+    def flush_servers(self):
+        """Skriver konfigurationen till disk om den har ändrats"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                data = {name: {key: value for key, value in asdict(server).items() if key != 'argv'}
+                        for name, server in self.servers.items()}
+                # Skriv till en temporär fil i samma katalog och byt ut atomärt, så att
+                # ett avbrott mitt i skrivningen aldrig lämnar en halv konfiguration
+                directory = os.path.dirname(self.config_file) or '.'
+                f = tempfile.NamedTemporaryFile('wb', dir=directory, suffix='.tmp', delete=False)
+                try:
+                    with f:
+                        f.write(_dumps(data))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    # NamedTemporaryFile skapas med 0600, behåll filens tidigare rättigheter
+                    if os.path.exists(self.config_file):
+                        shutil.copymode(self.config_file, f.name)
+                    else:
+                        os.chmod(f.name, 0o644)
+                    os.replace(f.name, self.config_file)
+                except BaseException:
+                    try:
+                        os.unlink(f.name)
+                    except OSError:
+                        pass
+                    raise
+                self._dirty = False
+                st = os.stat(self.config_file)
+                self._load_cache = ((st.st_mtime_ns, st.st_size), data)
+            except Exception as e:
+                print(f"Fel vid sparande av servrar: {e}")
     
     def add_server(self, name: str, command: str, port: int, working_directory: str, 
                    description: str = "", auto_start: bool = False):
         """Lägger till en ny server"""
-        if name in self.servers:
-            print(f"Server '{name}' finns redan!")
-            return False
-        
-        server = Server(
-            name=name,
-            command=command,
-            port=port,
-            working_directory=working_directory,
-            description=description,
-            auto_start=auto_start
-        )
-        
-        self.servers[name] = server
-        self.save_servers()
-        print(f"Server '{name}' har lagts till!")
-        return True
+        with self._lock:
+            if name in self.servers:
+                print(f"Server '{name}' finns redan!")
+                return False
+            
+            server = Server(
+                name=name,
+                command=command,
+                port=port,
+                working_directory=working_directory,
+                description=description,
+                auto_start=auto_start
+            )
+            
+            self.servers[name] = server
+            self.save_servers()
+            print(f"Server '{name}' har lagts till!")
+            return True
     
     def remove_server(self, name: str):
         """Tar bort en server"""
-        if name not in self.servers:
-            print(f"Server '{name}' hittades inte!")
-            return False
-        
-        if self.servers[name].status == "running":
-            self.stop_server(name)
-        
-        del self.servers[name]
-        self.save_servers()
-        print(f"Server '{name}' har tagits bort!")
-        return True
+        with self._lock:
+            if name not in self.servers:
+                print(f"Server '{name}' hittades inte!")
+                return False
+            
+            if self.servers[name].status == "running":
+                self.stop_server(name)
+            
+            del self.servers[name]
+            self._running.discard(name)
+            logfile = self._logfds.pop(name, None)
+            if logfile is not None:
+                logfile.close()
+            self.save_servers()
+            print(f"Server '{name}' har tagits bort!")
+            return True
     
     def list_servers(self):
         """Listar alla servrar"""
@@ -90,16 +331,15 @@ class ServerManager:
             print("Inga servrar konfigurerade.")
             return
         
-        print("\n" + "="*80)
-        print(f"{'Namn':<20} {'Port':<8} {'Status':<12} {'Beskrivning':<30}")
-        print("="*80)
-        
-        for name, server in self.servers.items():
-            status_color = "🟢" if server.status == "running" else "🔴"
-            print(f"{name:<20} {server.port:<8} {status_color} {server.status:<10} {server.description:<30}")
-        print("="*80)
-    
-    def start_server(self, name: str):
+        # Bygg hela tabellen och skriv den med ett enda anrop
+        rows = ["", "="*80, HEADER_ROW, "="*80]
+        rows += [ROW_FMT(name=name, port=server.port, emoji=STATUS_EMOJI.get(server.status, '🔴'),
+                         status=server.status, desc=server.description)
+                 for name, server in self.servers.items()]
+        rows.append("="*80)
+        sys.stdout.write("\n".join(rows) + "\n")
+    
+    def start_server(self, name: str, flush: bool = True):
         """Startar en server"""
         if name not in self.servers:
             print(f"Server '{name}' hittades inte!")
@@ -112,32 +352,50 @@ class ServerManager:
             return False
         
         try:
-            # Kontrollera om porten redan används
-            if self.is_port_in_use(server.port):
-                print(f"Port {server.port} används redan!")
-                return False
+            # Utdata går till en loggfil: en pipe som ingen läser fylls till slut
+            # och blockerar servern
+            logfile = self._log_file(name)
+            log_start = os.fstat(logfile.fileno()).st_size
             
-            # Starta servern
+            # Starta servern i en egen session. start_new_session görs i C i barnprocessen,
+            # till skillnad från preexec_fn, vilket låter subprocess använda vfork
             process = subprocess.Popen(
-                server.command.split(),
+                server.argv,
                 cwd=server.working_directory,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                preexec_fn=os.setsid if os.name != 'nt' else None
+                stdout=logfile,
+                stderr=subprocess.STDOUT,
+                start_new_session=os.name != 'nt'
             )
             
-            server.pid = process.pid
-            server.status = "running"
-            self.save_servers()
+            # Ingen portkontroll före start: om porten är upptagen misslyckas
+            # servern med bind() och avslutas direkt, vilket fångas här
+            try:
+                process.wait(timeout=STARTUP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                pass
+            else:
+                print(f"Server '{name}' avslutades direkt (kod {process.returncode})")
+                with open(self.log_path(name), 'rb') as f:
+                    f.seek(log_start)
+                    error = f.read().decode(errors='replace').strip()
+                if error:
+                    print(error.splitlines()[-1])
+                return False
             
-            print(f"Server '{name}' startad på port {server.port} (PID: {process.pid})")
+            with self._lock:
+                server.pid = process.pid
+                server.status = "running"
+                self._track(name, process.pid)
+                self._running.add(name)
+                self.save_servers(flush=flush)
+                print(f"Server '{name}' startad på port {server.port} (PID: {process.pid})")
             return True
             
         except Exception as e:
             print(f"Fel vid start av server '{name}': {e}")
             return False
     
-    def stop_server(self, name: str):
+    def stop_server(self, name: str, flush: bool = True):
         """Stoppar en server"""
         if name not in self.servers:
             print(f"Server '{name}' hittades inte!")
@@ -156,9 +414,12 @@ class ServerManager:
                 else:
                     subprocess.run(['taskkill', '/F', '/T', '/PID', str(server.pid)])
             
-            server.pid = None
-            server.status = "stopped"
-            self.save_servers()
+            with self._lock:
+                self._untrack(name)
+                self._running.discard(name)
+                server.pid = None
+                server.status = "stopped"
+                self.save_servers(flush=flush)
             
             print(f"Server '{name}' stoppad!")
             return True
@@ -170,15 +431,79 @@ class ServerManager:
     def restart_server(self, name: str):
         """Startar om en server"""
         print(f"Startar om server '{name}'...")
-        self.stop_server(name)
-        time.sleep(1)
+        server = self.servers.get(name)
+        pid = server.pid if server else None
+        
+        # Använd serverns pidfd (öppnad innan processen dödas) så att vi kan vänta
+        # på exakt den processen i stället för att sova en fast tid
+        exited = False
+        if pid and name not in self._pidfds:
+            try:
+                self._track(name, pid)
+            except ProcessLookupError:
+                exited = True
+        pidfd = self._pidfds.pop(name, None)
+        
+        try:
+            if self.stop_server(name) and not exited:
+                if pidfd is not None:
+                    self.wait_for_exit(pidfd)
+                else:
+                    time.sleep(1)
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
         self.start_server(name)
     
+    def wait_for_exit(self, pidfd: int, timeout: float = 5.0) -> bool:
+        """Väntar tills processen bakom en pidfd har avslutats"""
+        self._sel.register(pidfd, selectors.EVENT_READ, ('pidfd', pidfd))
+        try:
+            return bool(self._sel.select(timeout))
+        finally:
+            self._sel.unregister(pidfd)
+    
     def is_port_in_use(self, port: int) -> bool:
         """Kontrollerar om en port används"""
-        import socket
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            return s.connect_ex(('localhost', port)) == 0
+        return port in self.ports_in_use([port])
+    
+    def ports_in_use(self, ports, host: str = 'localhost', timeout: float = 0.2) -> set:
+        """Kontrollerar flera portar samtidigt med icke-blockerande connect och en enda select"""
+        addr = socket.gethostbyname(host)
+        in_use = set()
+        sockets = []
+        pending = set()
+        try:
+            for port in set(ports):
+                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sockets.append(s)
+                s.setblocking(False)
+                result = s.connect_ex((addr, port))
+                if result == 0:
+                    in_use.add(port)
+                elif result in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    self._sel.register(s, selectors.EVENT_WRITE, ('port', port))
+                    pending.add(s)
+            
+            deadline = time.monotonic() + timeout
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in self._sel.select(remaining):
+                    kind, port = key.data
+                    if kind != 'port' or key.fileobj not in pending:
+                        continue
+                    self._sel.unregister(key.fileobj)
+                    pending.discard(key.fileobj)
+                    if key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                        in_use.add(port)
+        finally:
+            for s in pending:
+                self._sel.unregister(s)
+            for s in sockets:
+                s.close()
+        return in_use
     
     def get_server_status(self, name: str):
         """Hämtar status för en specifik server"""
@@ -220,7 +545,7 @@ def main():
     
     # Starta servrar med auto_start
     for name, server in manager.servers.items():
-        if server.auto_start and server.status != "running":
+        if server.auto_start and name not in manager.running_servers:
             print(f"Auto-startar server '{name}'...")
             manager.start_server(name)
     
@@ -370,8 +695,11 @@ def start_all_servers(manager: ServerManager):
         return
     
     print("Startar alla servrar...")
-    for name in manager.servers:
-        manager.start_server(name)
+    # Popen släpper GIL under fork/exec och varje start väntar kort på att
+    # barnet inte avslutas direkt, så servrarna startas parallellt
+    with ThreadPoolExecutor(max_workers=min(8, len(manager.servers))) as executor:
+        list(executor.map(lambda name: manager.start_server(name, flush=False), list(manager.servers)))
+    manager.flush_servers()
 
 def stop_all_servers(manager: ServerManager):
     """Stoppar alla servrar"""
@@ -381,7 +709,8 @@ def stop_all_servers(manager: ServerManager):
     
     print("Stoppar alla servrar...")
     for name in manager.servers:
-        manager.stop_server(name)
+        manager.stop_server(name, flush=False)
+    manager.flush_servers()
 
 def admin_server_interactive(manager: ServerManager):
     """Interaktiv administration av servrar"""
@@ -465,6 +794,7 @@ def edit_server_config(manager: ServerManager):
         new_command = input(f"Kommando [{server.command}]: ").strip()
         if new_command:
             server.command = new_command
+            server.argv = split_command(new_command)
         
         new_port = input(f"Port [{server.port}]: ").strip()
         if new_port:
@@ -505,22 +835,37 @@ def show_server_logs(manager: ServerManager):
         if server.status == "running" and server.pid:
             print(f"🔍 Processinformation (PID: {server.pid}):")
             try:
-                import subprocess
-                result = subprocess.run(['ps', '-p', str(server.pid), '-o', 'pid,ppid,cmd'], 
-                                     capture_output=True, text=True, timeout=5)
-                if result.stdout:
-                    print(result.stdout)
+                if os.path.isdir('/proc'):
+                    ppid, cmd = _read_proc(server.pid)
+                    print(f"{'PID':>7} {'PPID':>7} CMD")
+                    print(f"{server.pid:>7} {ppid:>7} {cmd}")
+                else:
+                    result = subprocess.run(['ps', '-p', str(server.pid), '-o', 'pid,ppid,cmd'], 
+                                         capture_output=True, text=True, timeout=5)
+                    if result.stdout:
+                        print(result.stdout)
             except:
                 print("Kunde inte läsa processinformation")
+        
+        # Visa slutet av serverns loggfil
+        log_path = manager.log_path(name)
+        if os.path.exists(log_path):
+            with open(log_path, 'rb') as f:
+                f.seek(max(0, os.path.getsize(log_path) - 8192))
+                lines = f.read().decode(errors='replace').splitlines()[-20:]
+            print(f"\n📄 {log_path} (senaste {len(lines)} rader):")
+            for line in lines:
+                print(f"  {line}")
+        else:
+            print("\nIngen loggfil ännu.")
 
 def check_port_usage(manager: ServerManager):
     """Kontrollerar portanvändning"""
     print("\n--- Portanvändning ---")
     
-    used_ports = []
-    for name, server in manager.servers.items():
-        if manager.is_port_in_use(server.port):
-            used_ports.append((name, server.port, server.status))
+    in_use = manager.ports_in_use(server.port for server in manager.servers.values())
+    used_ports = [(name, server.port, server.status)
+                  for name, server in manager.servers.items() if server.port in in_use]
     
     if used_ports:
         print("🔴 Portar som används:")
@@ -533,26 +878,19 @@ def show_system_status():
     """Visar systemstatus"""
     print("\n--- Systemstatus ---")
     
+    # Kommandona skriver direkt till terminalen i stället för att deras utdata
+    # fångas, avkodas och skrivs ut igen
+    sections = (
+        ("💻 Systemresurser:", ['free', '-h']),
+        ("\n💾 Diskutrymme:", ['df', '-h']),
+        ("\n⏰ Systemuptime:", ['uptime']),
+    )
     try:
-        import subprocess
-        
-        # CPU och minne
-        print("💻 Systemresurser:")
-        result = subprocess.run(['free', '-h'], capture_output=True, text=True, timeout=5)
-        if result.stdout:
-            print(result.stdout)
-        
-        # Diskutrymme
-        print("\n💾 Diskutrymme:")
-        result = subprocess.run(['df', '-h'], capture_output=True, text=True, timeout=5)
-        if result.stdout:
-            print(result.stdout)
-        
-        # Uptime
-        print("\n⏰ Systemuptime:")
-        result = subprocess.run(['uptime'], capture_output=True, text=True, timeout=5)
-        if result.stdout:
-            print(result.stdout)
+        for title, command in sections:
+            print(title)
+            sys.stdout.flush()
+            subprocess.run(command, stderr=subprocess.DEVNULL, timeout=5)
+            print()
             
     except Exception as e:
         print(f"Kunde inte hämta systemstatus: {e}")
@@ -561,8 +899,7 @@ def manage_processes(manager: ServerManager):
     """Hanterar processer"""
     print("\n--- Processhantering ---")
     
-    running_servers = [name for name, server in manager.servers.items() 
-                      if server.status == "running"]
+    running_servers = sorted(manager.running_servers)
     
     if not running_servers:
         print("Inga servrar körs för tillfället.")
@@ -581,10 +918,15 @@ def manage_processes(manager: ServerManager):
     
     if choice == "1":
         try:
-            import subprocess
-            result = subprocess.run(['ps', 'aux'], capture_output=True, text=True, timeout=10)
-            if result.stdout:
-                print(result.stdout)
+            if os.path.isdir('/proc'):
+                print(f"{'PID':>7} {'PPID':>7} CMD")
+                for pid, ppid, cmd in _scan_processes():
+                    print(f"{pid:>7} {ppid:>7} {cmd}")
+            else:
+                command = ['tasklist'] if os.name == 'nt' else ['ps', 'aux']
+                result = subprocess.run(command, capture_output=True, text=True, timeout=10)
+                if result.stdout:
+                    print(result.stdout)
         except:
             print("Kunde inte visa processer")
     
@@ -605,10 +947,7 @@ def backup_restore_config(manager: ServerManager):
     choice = input("\nVälj alternativ: ").strip()
     
     if choice == "1":
-        import shutil
-        import datetime
-        
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
         backup_file = f"servers_backup_{timestamp}.json"
         
         try:
@@ -618,10 +957,11 @@ def backup_restore_config(manager: ServerManager):
             print(f"❌ Fel vid backup: {e}")
     
     elif choice == "2":
-        import os
-        import glob
-        
-        backup_files = glob.glob("servers_backup_*.json")
+        # Tidsstämpeln i namnet gör att nyaste backup hamnar först vid omvänd sortering
+        backup_files = sorted((entry.name for entry in os.scandir('.')
+                               if entry.name.startswith('servers_backup_')
+                               and entry.name.endswith('.json') and entry.is_file()),
+                              reverse=True)
         if not backup_files:
             print("Inga backup-filer hittades!")
             return
@@ -729,29 +1069,34 @@ def ssh_status():
     
     # Visa SSH-processer
     try:
-        result = subprocess.run(['ps', 'aux'], capture_output=True, text=True, timeout=5)
-        if result.stdout:
+        if os.path.isdir('/proc'):
+            ssh_processes = [f"{pid:>7} {ppid:>7} {cmd}" for pid, ppid, cmd in _scan_processes()
+                             if 'sshd' in cmd]
+        else:
+            result = subprocess.run(['ps', 'aux'], capture_output=True, text=True, timeout=5)
             ssh_processes = [line for line in result.stdout.split('\n') if 'sshd' in line]
-            if ssh_processes:
-                print(f"\n🔍 SSH-processer ({len(ssh_processes)}):")
-                for process in ssh_processes[:5]:  # Visa max 5
-                    print(f"  {process}")
-            else:
-                print("\n🔍 Inga SSH-processer hittades")
+        if ssh_processes:
+            print(f"\n🔍 SSH-processer ({len(ssh_processes)}):")
+            for process in ssh_processes[:5]:  # Visa max 5
+                print(f"  {process}")
+        else:
+            print("\n🔍 Inga SSH-processer hittades")
     except:
         print("⚠️  Kunde inte visa SSH-processer")
     
-    # Visa öppna portar
+    # Visa öppna portar, direkt från /proc/net/tcp om möjligt
     try:
-        result = subprocess.run(['ss', '-tlnp'], capture_output=True, text=True, timeout=5)
-        if result.stdout:
+        try:
+            ssh_ports = _listening_on_port(22)
+        except OSError:
+            result = subprocess.run(['ss', '-tlnp'], capture_output=True, text=True, timeout=5)
             ssh_ports = [line for line in result.stdout.split('\n') if ':22 ' in line]
-            if ssh_ports:
-                print(f"\n🌐 SSH-portar:")
-                for port in ssh_ports:
-                    print(f"  {port}")
-            else:
-                print("\n🌐 Inga SSH-portar öppna")
+        if ssh_ports:
+            print(f"\n🌐 SSH-portar:")
+            for port in ssh_ports:
+                print(f"  {port}")
+        else:
+            print("\n🌐 Inga SSH-portar öppna")
     except:
         print("⚠️  Kunde inte visa portar")
 
@@ -801,13 +1146,15 @@ def list_ssh_keys():
     """Listar befintliga SSH-nycklar"""
     print("\n--- Befintliga SSH-nycklar ---")
     
-    ssh_dir = os.path.expanduser("~/.ssh")
-    if not os.path.exists(ssh_dir):
+    ssh_dir = _ssh_dir()
+    try:
+        st = os.stat(ssh_dir)
+    except FileNotFoundError:
         print("❌ SSH-katalog hittades inte!")
         return
     
     key_files = []
-    for file in os.listdir(ssh_dir):
+    for file in _ssh_listdir(ssh_dir, st.st_mtime_ns):
         if file.startswith('id_') and not file.endswith('.pub'):
             key_files.append(file)
     
@@ -833,10 +1180,15 @@ def copy_public_key():
     """Kopierar publik SSH-nyckel"""
     print("\n--- Kopiera publik SSH-nyckel ---")
     
-    ssh_dir = os.path.expanduser("~/.ssh")
+    ssh_dir = _ssh_dir()
+    try:
+        st = os.stat(ssh_dir)
+    except FileNotFoundError:
+        print("❌ SSH-katalog hittades inte!")
+        return
     pub_keys = []
     
-    for file in os.listdir(ssh_dir):
+    for file in _ssh_listdir(ssh_dir, st.st_mtime_ns):
         if file.endswith('.pub'):
             pub_keys.append(file)
     